@@ -8,22 +8,42 @@
 مع Keep-Alive للعمل 24/7 على Render
 """
 
+import csv
+import hmac
+import io
 import json
 import logging
+import math
 import random
 import os
+import re
+import time
 import asyncio
-from typing import Dict, List
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import contextlib
+import itertools
+import tempfile
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterator, List, Set, Tuple
+from telegram import (
+    Update,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+)
+from telegram.error import TelegramError
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
+    InlineQueryHandler,
     ContextTypes,
 )
 
 # استيراد Flask للـ Keep-Alive
-from flask import Flask
+from flask import Flask, Response, request
 from threading import Thread
 
 # إعداد السجلات
@@ -36,38 +56,39 @@ logger = logging.getLogger(__name__)
 # إعداد Flask للـ Keep-Alive
 app = Flask(__name__)
 
-@app.route('/')
-def home():
-    """صفحة رئيسية بسيطة للتحقق من عمل البوت"""
-    return """
+def render_home_page(snapshot: Dict) -> str:
+    """بناء الصفحة الرئيسية من لقطة الإحصائيات"""
+    return f"""
     <html>
         <head>
             <meta charset="UTF-8">
             <title>Telegram Quiz Bot</title>
             <style>
-                body {
+                body {{
                     font-family: Arial, sans-serif;
                     text-align: center;
                     padding: 50px;
                     background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
                     color: white;
-                }
-                .container {
+                }}
+                .container {{
                     background: rgba(255,255,255,0.1);
                     padding: 30px;
                     border-radius: 15px;
                     backdrop-filter: blur(10px);
-                }
-                h1 { font-size: 2.5em; margin-bottom: 20px; }
-                p { font-size: 1.2em; }
-                .status { color: #4ade80; font-weight: bold; }
+                }}
+                h1 {{ font-size: 2.5em; margin-bottom: 20px; }}
+                p {{ font-size: 1.2em; }}
+                .status {{ color: #4ade80; font-weight: bold; }}
             </style>
         </head>
         <body>
             <div class="container">
                 <h1>🤖 بوت اختبارات شبكات الحاسب</h1>
                 <p class="status">✅ البوت يعمل بنجاح!</p>
-                <p>📊 عدد الأسئلة: 34 سؤال</p>
+                <p>📊 عدد الأسئلة: {snapshot['questions_count']} سؤال</p>
+                <p>👥 الجلسات النشطة: {snapshot['active_sessions']}</p>
+                <p>⏱️ مدة التشغيل: {snapshot['uptime']}</p>
                 <p>🔗 ابحث عن البوت في Telegram: <strong>@cs_networks_bot</strong></p>
                 <hr style="margin: 30px 0; border: 1px solid rgba(255,255,255,0.3);">
                 <p style="font-size: 0.9em;">Bot is running on Render 🚀</p>
@@ -76,11 +97,38 @@ def home():
     </html>
     """
 
+@app.route('/')
+def home():
+    """صفحة رئيسية بسيطة للتحقق من عمل البوت"""
+    return _home_page
+
+@app.route('/status')
+def status():
+    """لقطة الإحصائيات الحالية للبوت"""
+    return _stats_snapshot, 200
+
 @app.route('/health')
 def health():
     """نقطة فحص صحة البوت"""
     return {"status": "ok", "bot": "running"}, 200
 
+@app.route('/export/<kind>/<fmt>')
+def export_results(kind: str, fmt: str):
+    """تصدير النتائج عبر HTTP على شكل دفعات متتالية"""
+    # الرمز في الترويسة وليس في الرابط حتى لا يظهر في سجلات الطلبات
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not EXPORT_TOKEN or not hmac.compare_digest(token.encode(), EXPORT_TOKEN.encode()):
+        return {"status": "error", "message": "unauthorized"}, 403
+    if kind not in EXPORT_KINDS or fmt not in EXPORT_FORMATS:
+        return {"status": "error", "message": "unknown export"}, 404
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(
+        iter_export_chunks(kind, fmt),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=quiz_{kind}.{fmt}'}
+    )
+
 def run_flask():
     """تشغيل Flask في thread منفصل"""
     port = int(os.environ.get("PORT", 10000))
@@ -103,6 +151,92 @@ def load_questions():
 QUESTIONS = load_questions()
 TOTAL_QUESTIONS = len(QUESTIONS)
 
+# ===== البحث في بنك الأسئلة (Inline Mode) =====
+
+# التشكيل والتطويل وعلامات القرآن
+ARABIC_DIACRITICS = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+# توحيد أشكال الألف والياء والتاء المربوطة
+ARABIC_FOLDING = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+})
+WORD_PATTERN = re.compile(r'\w+')
+
+def normalize_text(text: str) -> str:
+    """تطبيع النص العربي: حذف التشكيل وتوحيد الحروف المتشابهة"""
+    return ARABIC_DIACRITICS.sub('', text).translate(ARABIC_FOLDING).lower()
+
+def tokenize(text: str) -> List[str]:
+    """تقسيم النص المطبَّع إلى كلمات"""
+    return WORD_PATTERN.findall(normalize_text(text))
+
+def strip_article(word: str) -> str:
+    """حذف "ال" التعريف من بداية الكلمة (مثل: الموجه ← موجه)"""
+    if word.startswith('ال') and len(word) > 3:
+        return word[2:]
+    return word
+
+def question_terms(question_data: Dict) -> Set[str]:
+    """كلمات السؤال وخياراته وشرحه التي تُفهرس"""
+    text = ' '.join([
+        question_data.get('question', ''),
+        *question_data.get('options', []),
+        question_data.get('explanation', ''),
+    ])
+    terms = set()
+    for word in tokenize(text):
+        terms.add(word)
+        terms.add(strip_article(word))
+    return terms
+
+class QuestionIndex:
+    """فهرس مقلوب للأسئلة مع بحث بالبادئة وذاكرة مؤقتة للاستعلامات"""
+    
+    CACHE_SIZE = 1024
+    
+    def __init__(self, questions: List[Dict]):
+        self._postings: Dict[str, Set[int]] = {}
+        for question_index, question_data in enumerate(questions):
+            for term in question_terms(question_data):
+                self._postings.setdefault(term, set()).add(question_index)
+        self._terms: List[str] = sorted(self._postings)  # مرتبة للبحث بالبادئة
+        self._cache: Dict[str, Tuple[int, ...]] = {}
+    
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        """جميع الأسئلة التي تحتوي كلمة تبدأ بالبادئة"""
+        matches = set()
+        position = bisect_left(self._terms, prefix)
+        while position < len(self._terms) and self._terms[position].startswith(prefix):
+            matches |= self._postings[self._terms[position]]
+            position += 1
+        return matches
+    
+    def search(self, query: str) -> Tuple[int, ...]:
+        """البحث عن الأسئلة التي تطابق جميع كلمات الاستعلام (كبادئات)"""
+        words = tokenize(query)
+        key = ' '.join(words)
+        if key in self._cache:
+            return self._cache[key]
+        
+        result = None
+        for word in words:
+            matches = self._prefix_matches(strip_article(word))
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        
+        found = tuple(sorted(result)) if result else ()
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[key] = found
+        return found
+
+# يُبنى الفهرس مرة واحدة عند التحميل، فبنك الأسئلة لا يتغير إلا بإعادة تشغيل البوت
+QUESTION_INDEX = QuestionIndex(QUESTIONS)
+
+INLINE_RESULTS_LIMIT = 20
+INLINE_CACHE_SECONDS = 300
+
 # تخزين بيانات المستخدمين
 user_data: Dict[int, Dict] = {}
 
@@ -115,10 +249,114 @@ def get_user_data(user_id: int) -> Dict:
             'correct_answers': 0,
             'wrong_answers': 0,
             'asked_questions': [],
+            'answers': [],
             'current_question': None
         }
     return user_data[user_id]
 
+# ===== لقطة الإحصائيات المشتركة =====
+
+# ملف اللقطة الذي يقرؤه keep_alive.py عند تشغيله كعملية منفصلة
+STATS_FILE = os.environ.get(
+    "STATS_FILE", os.path.join(tempfile.gettempdir(), "quiz_bot_stats.json")
+)
+STATS_INTERVAL = 5
+ACTIVE_SESSION_SECONDS = 600
+
+BOT_STARTED_AT = time.time()
+# أوقات الإجابات الأخيرة وزمن معالجتها (بالمللي ثانية)
+_answer_times: deque = deque(maxlen=10000)
+_answer_latencies: deque = deque(maxlen=1000)
+# آخر نشاط لكل مستخدم لحساب الجلسات النشطة
+_last_activity: Dict[int, float] = {}
+
+def record_activity(user_id: int):
+    """تسجيل نشاط المستخدم"""
+    _last_activity[user_id] = time.monotonic()
+
+def record_answer(user_id: int, latency: float):
+    """تسجيل إجابة وزمن معالجتها بالثواني"""
+    now = time.monotonic()
+    _last_activity[user_id] = now
+    _answer_times.append(now)
+    _answer_latencies.append(latency * 1000)
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """حساب النسبة المئوية (nearest-rank) من قائمة مرتبة"""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(fraction * len(sorted_values)))) - 1
+    return round(sorted_values[rank], 1)
+
+def build_stats_snapshot() -> Dict:
+    """بناء لقطة الإحصائيات الحالية"""
+    now = time.monotonic()
+    
+    # حذف المستخدمين غير النشطين حتى يبقى القاموس صغيراً
+    for user_id in [u for u, seen in _last_activity.items() if now - seen > ACTIVE_SESSION_SECONDS]:
+        del _last_activity[user_id]
+    
+    while _answer_times and now - _answer_times[0] > 60:
+        _answer_times.popleft()
+    
+    latencies = sorted(_answer_latencies)
+    uptime_seconds = int(time.time() - BOT_STARTED_AT)
+    days, remainder = divmod(uptime_seconds, 86400)
+    hours, remainder = divmod(remainder, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    
+    return {
+        "questions_count": TOTAL_QUESTIONS,
+        "total_users": len(user_data),
+        "active_sessions": len(_last_activity),
+        "answers_per_minute": len(_answer_times),
+        "uptime_seconds": uptime_seconds,
+        "uptime": f"{days}d {hours:02d}:{minutes:02d}:{seconds:02d}",
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+        },
+        "started_at": datetime.fromtimestamp(BOT_STARTED_AT).isoformat(),
+        "updated_at": datetime.now().isoformat(),
+    }
+
+def write_stats_snapshot(snapshot: Dict):
+    """كتابة اللقطة في ملف مؤقت ثم استبداله ذرياً بالملف الأصلي"""
+    directory = os.path.dirname(STATS_FILE) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, STATS_FILE)
+    except BaseException:
+        # حذف الملف المؤقت حتى لا تتراكم ملفات يتيمة عند تكرار الفشل
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+# اللقطة الحالية لصفحات Flask في نفس العملية (يُستبدل المرجع كاملاً عند كل تحديث)
+_stats_snapshot: Dict = build_stats_snapshot()
+_home_page: str = render_home_page(_stats_snapshot)
+
+async def publish_stats_loop():
+    """تحديث لقطة الإحصائيات ونشرها دورياً"""
+    global _stats_snapshot, _home_page
+    
+    while True:
+        try:
+            _stats_snapshot = build_stats_snapshot()
+            _home_page = render_home_page(_stats_snapshot)
+            await asyncio.to_thread(write_stats_snapshot, _stats_snapshot)
+        except Exception:
+            # نستمر في المحاولة حتى لا تتجمد اللقطة بسبب خطأ عابر
+            logger.exception("تعذر تحديث لقطة الإحصائيات")
+        await asyncio.sleep(STATS_INTERVAL)
+
+async def post_init(application: Application):
+    """بدء نشر الإحصائيات بعد تهيئة البوت"""
+    application.create_task(publish_stats_loop())
+
 def get_final_results_text(user_id: int) -> str:
     """الحصول على نص النتيجة النهائية"""
     data = get_user_data(user_id)
@@ -148,6 +386,111 @@ def get_final_results_text(user_id: int) -> str:
 """
     return results
 
+# إعدادات تصدير النتائج
+# معرفات المشرفين المسموح لهم باستخدام /export (مفصولة بفواصل)
+ADMIN_IDS = {
+    int(admin_id) for admin_id in os.environ.get("ADMIN_IDS", "").split(",")
+    if admin_id.strip().isdigit()
+}
+# رمز حماية مسار /export في Flask (يُعطّل المسار إذا لم يُعيَّن)
+EXPORT_TOKEN = os.environ.get("EXPORT_TOKEN", "")
+EXPORT_KINDS = ('users', 'answers')
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_CHUNK_ROWS = 500
+# الحد الأقصى لحجم الملفات التي يرسلها البوت عبر Telegram
+EXPORT_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+EXPORT_FIELDS = {
+    'users': ['user_id', 'score', 'total_answered', 'correct_answers', 'wrong_answers', 'percentage'],
+    'answers': ['user_id', 'question_index', 'question', 'selected_option', 'correct_option', 'is_correct'],
+}
+
+def iter_user_ids() -> Iterator[int]:
+    """المرور على معرفات المستخدمين دون نسخها رغم إضافة مستخدمين أثناء التكرار"""
+    # المستخدمون لا يُحذفون من user_data، والجدد يُضافون في آخره فقط،
+    # لذلك يمكن استئناف التكرار من الموضع نفسه إذا تغيّر حجم القاموس
+    position = 0
+    while True:
+        try:
+            for user_id in itertools.islice(user_data, position, None):
+                position += 1
+                yield user_id
+            return
+        except RuntimeError:
+            continue
+
+def iter_export_rows(kind: str) -> Iterator[Dict]:
+    """توليد صفوف التصدير صفاً صفاً دون بناء قائمة كاملة في الذاكرة"""
+    for user_id in iter_user_ids():
+        data = user_data.get(user_id)
+        if data is None:
+            continue
+        
+        if kind == 'users':
+            total = data['total_answered']
+            yield {
+                'user_id': user_id,
+                'score': data['score'],
+                'total_answered': total,
+                'correct_answers': data['correct_answers'],
+                'wrong_answers': data['wrong_answers'],
+                'percentage': round(data['score'] / total * 100, 1) if total > 0 else 0,
+            }
+            continue
+        
+        for question_index, selected_option, is_correct in list(data['answers']):
+            question_data = QUESTIONS[question_index] if question_index < len(QUESTIONS) else {}
+            yield {
+                'user_id': user_id,
+                'question_index': question_index,
+                'question': question_data.get('question', ''),
+                'selected_option': selected_option,
+                'correct_option': question_data.get('correct', ''),
+                'is_correct': is_correct,
+            }
+
+def iter_export_chunks(kind: str, fmt: str) -> Iterator[str]:
+    """تجميع صفوف التصدير في دفعات نصية بحجم ثابت (CSV أو JSONL)"""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == 'csv':
+        # BOM حتى يعرض Excel النص العربي بشكل صحيح
+        buffer.write('\ufeff')
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS[kind])
+        writer.writeheader()
+    
+    rows = 0
+    for row in iter_export_rows(kind):
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False) + '\n')
+        rows += 1
+        
+        if rows % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def has_export_rows(kind: str) -> bool:
+    """التحقق من وجود صف واحد على الأقل للتصدير"""
+    return next(iter_export_rows(kind), None) is not None
+
+def write_export_file(kind: str, fmt: str) -> str:
+    """كتابة ملف التصدير على القرص دفعة بدفعة وإرجاع مساره"""
+    fd, path = tempfile.mkstemp(suffix=f'.{fmt}')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            for chunk in iter_export_chunks(kind, fmt):
+                f.write(chunk)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(path)
+        raise
+    return path
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """معالج أمر /start"""
     user_id = update.effective_user.id
@@ -161,6 +504,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
             'correct_answers': 0,
             'wrong_answers': 0,
             'asked_questions': [],
+            'answers': [],
             'current_question': None
         }
     
@@ -273,10 +617,35 @@ async def quiz(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     chat_id = update.effective_chat.id
     
+    record_activity(user_id)
     await send_next_question(chat_id, context, user_id)
 
+async def inline_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """معالج البحث المضمّن (Inline Mode) في بنك الأسئلة"""
+    inline_query = update.inline_query
+    
+    results = []
+    for question_index in QUESTION_INDEX.search(inline_query.query)[:INLINE_RESULTS_LIMIT]:
+        question_data = QUESTIONS[question_index]
+        correct_option = question_data['options'][question_data['correct']]
+        results.append(
+            InlineQueryResultArticle(
+                id=str(question_index),
+                title=question_data['question'],
+                description=f"✅ {correct_option}",
+                input_message_content=InputTextMessageContent(
+                    f"❓ {question_data['question']}\n\n"
+                    f"✅ الإجابة الصحيحة: {correct_option}\n\n"
+                    f"💡 {question_data['explanation']}"
+                )
+            )
+        )
+    
+    await inline_query.answer(results, cache_time=INLINE_CACHE_SECONDS)
+
 async def handle_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """معالج الإجابات"""
+    started = time.monotonic()
     query = update.callback_query
     await query.answer()
     
@@ -307,6 +676,7 @@ async def handle_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # التحقق من الإجابة
     is_correct = (selected_option == correct_answer)
+    data['answers'].append((question_index, selected_option, is_correct))
     
     if is_correct:
         data['score'] += 1
@@ -339,9 +709,11 @@ async def handle_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
         response += get_final_results_text(user_id)
         response += "\n\nاستخدم /reset للبدء من جديد"
         await query.edit_message_text(response)
+        record_answer(user_id, time.monotonic() - started)
     else:
         response += "⏳ السؤال التالي سيظهر خلال 3 ثوانٍ..."
         await query.edit_message_text(response)
+        record_answer(user_id, time.monotonic() - started)
         
         # إرسال السؤال التالي بعد 3 ثوانٍ
         await asyncio.sleep(3)
@@ -396,6 +768,7 @@ async def reset(update: Update, context: ContextTypes.DEFAULT_TYPE):
         'correct_answers': 0,
         'wrong_answers': 0,
         'asked_questions': [],
+        'answers': [],
         'current_question': None
     }
     
@@ -404,6 +777,52 @@ async def reset(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "استخدم /quiz لبدء الاختبار من جديد."
     )
 
+async def export(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """معالج أمر /export - تصدير النتائج للمشرفين كملف"""
+    user_id = update.effective_user.id
+    
+    if user_id not in ADMIN_IDS:
+        await update.message.reply_text("⛔ هذا الأمر متاح للمشرفين فقط.")
+        return
+    
+    args = context.args or []
+    kind = args[0].lower() if args else 'users'
+    fmt = args[1].lower() if len(args) > 1 else 'csv'
+    
+    if kind not in EXPORT_KINDS or fmt not in EXPORT_FORMATS:
+        await update.message.reply_text(
+            "❌ الاستخدام: /export [users|answers] [csv|jsonl]"
+        )
+        return
+    
+    # Telegram يرفض الملفات الفارغة
+    if not await asyncio.to_thread(has_export_rows, kind):
+        await update.message.reply_text("📭 لا توجد بيانات للتصدير بعد.")
+        return
+    
+    await update.message.reply_text("⏳ جاري تجهيز ملف التصدير...")
+    
+    # الكتابة تتم في thread منفصل حتى لا تتوقف حلقة الأحداث
+    path = await asyncio.to_thread(write_export_file, kind, fmt)
+    try:
+        if os.path.getsize(path) > EXPORT_MAX_UPLOAD_BYTES:
+            await update.message.reply_text(
+                "⚠️ ملف التصدير أكبر من 50 ميجابايت ولا يمكن إرساله عبر Telegram.\n\n"
+                f"استخدم المسار /export/{kind}/{fmt} على خادم البوت لتحميله."
+            )
+            return
+        
+        with open(path, 'rb') as f:
+            await update.message.reply_document(
+                document=f,
+                filename=f"quiz_{kind}.{fmt}"
+            )
+    except TelegramError as e:
+        logger.error(f"فشل إرسال ملف التصدير: {e}")
+        await update.message.reply_text("❌ تعذر إرسال ملف التصدير، حاول مرة أخرى لاحقاً.")
+    finally:
+        os.remove(path)
+
 def main():
     """تشغيل البوت"""
     # التوكن من متغيرات البيئة
@@ -420,7 +839,7 @@ def main():
     flask_thread.start()
     
     # إنشاء التطبيق
-    application = Application.builder().token(TOKEN).build()
+    application = Application.builder().token(TOKEN).post_init(post_init).build()
     
     # إضافة المعالجات
     application.add_handler(CommandHandler("start", start))
@@ -429,7 +848,9 @@ def main():
     application.add_handler(CommandHandler("score", score))
     application.add_handler(CommandHandler("stats", stats))
     application.add_handler(CommandHandler("reset", reset))
+    application.add_handler(CommandHandler("export", export))
     application.add_handler(CallbackQueryHandler(handle_answer, pattern="^answer_"))
+    application.add_handler(InlineQueryHandler(inline_search))
     
     # تشغيل البوت
     logger.info(f"🤖 البوت يعمل الآن على Render... (عدد الأسئلة: {TOTAL_QUESTIONS})")
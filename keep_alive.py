@@ -8,35 +8,132 @@
 
 from flask import Flask, jsonify
 from datetime import datetime
+from threading import Thread
+import json
+import logging
 import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# معلومات البوت
+# ملف لقطة الإحصائيات الذي ينشره bot.py (يُستبدل ذرياً عند كل تحديث)
+STATS_FILE = os.environ.get(
+    "STATS_FILE", os.path.join(tempfile.gettempdir(), "quiz_bot_stats.json")
+)
+STATS_REFRESH_SECONDS = 5
+# تُعتبر اللقطة قديمة إذا لم تُحدَّث خلال هذه المدة
+STATS_STALE_SECONDS = 30
+# الحقول التي يجب أن تحتويها اللقطة وأنواعها حتى تُستخدم
+STATS_FIELD_TYPES = {
+    "questions_count": int,
+    "active_sessions": int,
+    "uptime": str,
+    "updated_at": str,
+}
+
+# نص شريط الحالة في الصفحة الرئيسية لكل حالة
+STATUS_BANNERS = {
+    "active": "✅ البوت يعمل بنجاح!",
+    "stale": "⚠️ البوت لم يحدّث إحصائياته مؤخراً",
+    "waiting": "⏳ في انتظار أول تحديث من البوت",
+}
+
+# معلومات البوت الثابتة (عدد الأسئلة يأتي من لقطة الإحصائيات)
 BOT_INFO = {
     "name": "Telegram Quiz Bot",
     "description": "بوت اختبارات أساسيات شبكات الحاسب",
-    "questions_count": 34,
     "bot_username": "@cs_networks_bot",
     "version": "2.0",
     "features": [
-        "34 سؤال في شبكات الحاسب",
         "انتقال تلقائي للأسئلة",
         "إحصائيات مفصلة",
         "يعمل 24/7 على Render"
     ]
 }
 
-@app.route('/')
-def home():
-    """الصفحة الرئيسية - عرض معلومات البوت"""
+def count_questions() -> int:
+    """عدد الأسئلة في questions.json (يُستخدم قبل أن ينشر البوت أول لقطة)"""
+    try:
+        with open('questions.json', 'r', encoding='utf-8') as f:
+            return len(json.load(f))
+    except (OSError, json.JSONDecodeError):
+        return 0
+
+def read_stats_snapshot():
+    """قراءة آخر لقطة نشرها البوت، أو None إذا لم تتوفر"""
+    try:
+        with open(STATS_FILE, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        age = time.time() - os.path.getmtime(STATS_FILE)
+    except (OSError, json.JSONDecodeError):
+        return None, None
+    if not isinstance(snapshot, dict) or not all(
+        isinstance(snapshot.get(key), field_type) for key, field_type in STATS_FIELD_TYPES.items()
+    ):
+        logger.warning(f"تم تجاهل ملف إحصائيات غير صالح: {STATS_FILE}")
+        return None, None
+    return snapshot, age
+
+def build_state() -> dict:
+    """تجهيز جميع الاستجابات مسبقاً من آخر لقطة"""
+    snapshot, age = read_stats_snapshot()
+    if snapshot is None:
+        status_text = "waiting"
+        snapshot = {
+            "questions_count": count_questions(),
+            "active_sessions": 0,
+            "answers_per_minute": 0,
+            "uptime": None,
+            "updated_at": datetime.now().isoformat(),
+        }
+    elif age > STATS_STALE_SECONDS:
+        status_text = "stale"
+    else:
+        status_text = "active"
+    
+    info = dict(BOT_INFO)
+    info["questions_count"] = snapshot["questions_count"]
+    info["features"] = [
+        f"{snapshot['questions_count']} سؤال في شبكات الحاسب",
+        *BOT_INFO["features"],
+    ]
+    
+    return {
+        "info": info,
+        "status": {
+            "bot_info": info,
+            "status": status_text,
+            "uptime": snapshot.get("uptime"),
+            "stats": snapshot,
+            "timestamp": snapshot.get("updated_at"),
+        },
+        "home": render_home(info, snapshot, status_text),
+    }
+
+def refresh_state():
+    """تحديث الاستجابات الجاهزة دورياً في thread منفصل"""
+    global _state
+    while True:
+        time.sleep(STATS_REFRESH_SECONDS)
+        try:
+            # استبدال المرجع كاملاً حتى لا تحتاج الطلبات إلى أي قفل
+            _state = build_state()
+        except Exception:
+            # نُبقي الحالة السابقة حتى لا يتوقف التحديث بسبب لقطة تالفة
+            logger.exception("فشل تحديث لقطة الإحصائيات")
+
+def render_home(info: dict, snapshot: dict, status_text: str) -> str:
+    """بناء الصفحة الرئيسية من معلومات البوت ولقطة الإحصائيات"""
     return f"""
     <!DOCTYPE html>
     <html lang="ar" dir="rtl">
     <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{BOT_INFO['name']}</title>
+        <title>{info['name']}</title>
         <style>
             * {{
                 margin: 0;
@@ -89,6 +186,14 @@ def home():
                 animation: pulse 2s infinite;
             }}
             
+            .status.stale {{
+                background: #f59e0b;
+            }}
+            
+            .status.waiting {{
+                background: #9ca3af;
+            }}
+            
             @keyframes pulse {{
                 0%, 100% {{ transform: scale(1); }}
                 50% {{ transform: scale(1.05); }}
@@ -185,37 +290,45 @@ def home():
     <body>
         <div class="container">
             <div class="emoji">🤖</div>
-            <h1>{BOT_INFO['name']}</h1>
+            <h1>{info['name']}</h1>
             
-            <div class="status">
-                ✅ البوت يعمل بنجاح!
+            <div class="status {status_text}">
+                {STATUS_BANNERS[status_text]}
             </div>
             
             <div class="info">
                 <div class="info-item">
                     <span class="info-icon">📚</span>
-                    <span class="info-text"><strong>الوصف:</strong> {BOT_INFO['description']}</span>
+                    <span class="info-text"><strong>الوصف:</strong> {info['description']}</span>
                 </div>
                 <div class="info-item">
                     <span class="info-icon">📊</span>
-                    <span class="info-text"><strong>عدد الأسئلة:</strong> {BOT_INFO['questions_count']} سؤال</span>
+                    <span class="info-text"><strong>عدد الأسئلة:</strong> {info['questions_count']} سؤال</span>
                 </div>
                 <div class="info-item">
                     <span class="info-icon">🔗</span>
-                    <span class="info-text"><strong>اسم البوت:</strong> {BOT_INFO['bot_username']}</span>
+                    <span class="info-text"><strong>اسم البوت:</strong> {info['bot_username']}</span>
+                </div>
+                <div class="info-item">
+                    <span class="info-icon">👥</span>
+                    <span class="info-text"><strong>الجلسات النشطة:</strong> {snapshot['active_sessions']}</span>
+                </div>
+                <div class="info-item">
+                    <span class="info-icon">⏱️</span>
+                    <span class="info-text"><strong>مدة التشغيل:</strong> {snapshot['uptime'] or '-'}</span>
                 </div>
                 <div class="info-item">
                     <span class="info-icon">🚀</span>
-                    <span class="info-text"><strong>الإصدار:</strong> {BOT_INFO['version']}</span>
+                    <span class="info-text"><strong>الإصدار:</strong> {info['version']}</span>
                 </div>
             </div>
             
             <div class="features">
                 <h2>✨ المميزات</h2>
-                {''.join([f'<div class="feature-item">✓ {feature}</div>' for feature in BOT_INFO['features']])}
+                {''.join([f'<div class="feature-item">✓ {feature}</div>' for feature in info['features']])}
             </div>
             
-            <a href="https://t.me/{BOT_INFO['bot_username'][1:]}" class="cta" target="_blank">
+            <a href="https://t.me/{info['bot_username'][1:]}" class="cta" target="_blank">
                 افتح البوت في Telegram
             </a>
             
@@ -225,13 +338,20 @@ def home():
             </div>
             
             <div class="timestamp">
-                آخر تحديث: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+                آخر تحديث: {snapshot['updated_at'][:19].replace('T', ' ')}
             </div>
         </div>
     </body>
     </html>
     """
 
+_state = build_state()
+
+@app.route('/')
+def home():
+    """الصفحة الرئيسية - عرض معلومات البوت"""
+    return _state["home"]
+
 @app.route('/health')
 def health():
     """نقطة فحص صحة البوت"""
@@ -253,21 +373,17 @@ def ping():
 @app.route('/status')
 def status():
     """معلومات حالة البوت"""
-    return jsonify({
-        "bot_info": BOT_INFO,
-        "status": "active",
-        "uptime": "running",
-        "timestamp": datetime.now().isoformat()
-    }), 200
+    return jsonify(_state["status"]), 200
 
 @app.route('/api/info')
 def api_info():
     """API للحصول على معلومات البوت"""
-    return jsonify(BOT_INFO), 200
+    return jsonify(_state["info"]), 200
 
 def run_server():
     """تشغيل خادم Flask"""
     port = int(os.environ.get("PORT", 10000))
+    Thread(target=refresh_state, daemon=True).start()
     app.run(host='0.0.0.0', port=port, debug=False)
 
 if __name__ == '__main__':